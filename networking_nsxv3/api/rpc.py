@@ -105,7 +105,9 @@ class NSXv3ServerRpcApi(object):
     changing rpc interfaces, see doc/source/contributor/internals/rpc_api.rst.
     """
 
-    rpc_version = nsxv3_constants.NSXV3_SERVER_RPC_VERSION
+    # Calls are sent as 1.0 so that older servers accept them, the calls
+    # added later prepare their own version
+    rpc_version = '1.0'
 
     _LIMIT = 100
     _CREATE_AFTER = datetime.utcfromtimestamp(0).isoformat()
@@ -172,23 +174,40 @@ class NSXv3ServerRpcApi(object):
 
     @log_helpers.log_method_call
     def get_port(self, port_id):
+        # Superseded by get_port_full on 1.1 servers
         cctxt = self.client.prepare()
         return cctxt.call(self.context, 'get_port', port_id=port_id)
 
+    def can_get_port_full(self):
+        return self.client.can_send_version('1.1')
+
+    @log_helpers.log_method_call
+    def get_port_full(self, port_id):
+        cctxt = self.client.prepare(version='1.1')
+        return cctxt.call(self.context, 'get_port_full', port_id=port_id)
+
+    @log_helpers.log_method_call
+    def get_ports_full(self, port_ids):
+        cctxt = self.client.prepare(version='1.1')
+        return cctxt.call(self.context, 'get_ports_full', port_ids=port_ids)
+
     @log_helpers.log_method_call
     def get_port_security_groups(self, port_id):
+        # Superseded by get_port_full on 1.1 servers
         cctxt = self.client.prepare()
         return cctxt.call(self.context, 'get_port_security_groups',
                           port_id=port_id)
 
     @log_helpers.log_method_call
     def get_port_allowed_pairs(self, port_id):
+        # Superseded by get_port_full on 1.1 servers
         cctxt = self.client.prepare()
         return cctxt.call(self.context, 'get_port_allowed_pairs',
                           port_id=port_id)
 
     @log_helpers.log_method_call
     def get_port_addresses(self, port_id):
+        # Superseded by get_port_full on 1.1 servers
         cctxt = self.client.prepare()
         return cctxt.call(self.context, 'get_port_addresses', port_id=port_id)
 
@@ -268,6 +287,14 @@ class NSXv3ServerRpcCallback(object):
     def get_port(self, context, port_id):
         return db.get_port(context, port_id)
 
+    @log_helpers.log_method_call
+    def get_port_full(self, context, port_id):
+        return db.get_port_full(context, port_id)
+
+    @log_helpers.log_method_call
+    def get_ports_full(self, context, port_ids):
+        return db.get_ports_full(context, port_ids)
+
     @log_helpers.log_method_call
     def get_port_security_groups(self, context, port_id):
         return db.get_port_security_groups(context, port_id)
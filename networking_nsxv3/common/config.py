@@ -38,11 +38,25 @@ agent_opts = [
     #     default=5,
     #     help="NSXv3 agent RPC timeout in seconds."
     # ),
+    cfg.IntOpt(
+        'sync_safety_polling_intervals',
+        default=10,
+        help="Polling intervals without notified changes after which the "
+             "inventory is synchronized anyway."
+    ),
     cfg.IntOpt(
         'rpc_max_records_per_query',
         default=2000,
         help="Neutron RPC maximum records per query."
     ),
+    cfg.StrOpt(
+        'security_group_members_aggregation',
+        default='ranges',
+        choices=['ranges', 'netaddr'],
+        help="Implementation aggregating Security Group members into "
+             "CIDRs. ranges merges the members as integer ranges, netaddr "
+             "is the legacy and slower netaddr.IPSet implementation."
+    ),
     cfg.BoolOpt(
         'enable_runtime_migration_from_dvs_driver',
         default=False,
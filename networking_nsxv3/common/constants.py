@@ -33,5 +33,7 @@ NSXV3_CAPABILITY_TCP_STRICT = "capability_tcp_strict"
 #   1.4 Added support for network_update
 #   1.5 Added binding_activate and binding_deactivate
 RPC_VERSION = '1.5'
-NSXV3_SERVER_RPC_VERSION = '1.0'
+# Server RPC API history
+#   1.1 Added get_port_full and get_ports_full
+NSXV3_SERVER_RPC_VERSION = '1.1'
 NSXV3_SERVER_RPC_TOPIC = "nsxv3"
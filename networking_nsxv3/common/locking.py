@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
 import os
 import traceback
 
@@ -21,13 +22,18 @@ from oslo_config import cfg
 from oslo_log import log
 from tooz import coordination
 
+from networking_nsxv3.common.synchronization import ReaderWriterLock
+
 LOG = log.getLogger(__name__)
 
+RWLOCK_STRIPES = 256
+
 
 class LockManager(object):
     _coordinator = None
     _coordinator_pid = None
     _connect_string = cfg.CONF.AGENT.locking_coordinator_url
+    _rwlocks = [ReaderWriterLock() for _ in range(RWLOCK_STRIPES)]
 
     def __init__(self):
         LOG.debug('LockManager initialized!')
@@ -47,6 +53,11 @@ class LockManager(object):
                       traceback.extract_stack())
             return lck
 
+    @staticmethod
+    def get_rwlock(name):
+        stripe = LockManager._rwlocks[hash(name) % RWLOCK_STRIPES]
+        return NamedReaderWriterLock(name, stripe)
+
     @staticmethod
     def _get_lock_local(name, **kwargs):
         return lockutils.lock(name, **kwargs)
@@ -67,3 +78,41 @@ class LockManager(object):
 
         LOG.debug('Retrieved lock for %s', name)
         return LockManager._coordinator.get_lock(name)
+
+
+class NamedReaderWriterLock(object):
+    """Reader/writer lock of a named resource.
+
+    Readers share a process local lock stripe. Writers take the stripe
+    exclusively and also the (external or distributed) lock of the resource,
+    so writers stay serialized with other processes as with get_lock.
+    The write section receives a HeldReaderWriterLock to pass on to code
+    expecting a lock of the same resource.
+    """
+
+    def __init__(self, name, stripe):
+        self._name = name
+        self._stripe = stripe
+
+    @contextlib.contextmanager
+    def read(self):
+        with self._stripe.read():
+            yield self
+
+    @contextlib.contextmanager
+    def write(self):
+        with self._stripe.write():
+            with LockManager.get_lock(self._name):
+                yield HeldReaderWriterLock()
+
+
+class HeldReaderWriterLock(object):
+    """Reader/writer lock already held for writing by the caller."""
+
+    @contextlib.contextmanager
+    def read(self):
+        yield self
+
+    @contextlib.contextmanager
+    def write(self):
+        yield self
@@ -4,11 +4,14 @@ Synchronization - classes related concurrent execution scheduling and limits
 import os
 import time
 import functools
+import contextlib
 import collections
 from enum import Enum
+
+import eventlet
 from oslo_log import log as logging
+
 if not os.environ.get('DISABLE_EVENTLET_PATCHING'):
-    import eventlet
     eventlet.monkey_patch()
 
 LOG = logging.getLogger(__name__)
@@ -37,6 +40,8 @@ class Runner(object):
     Passive - containing all jobs submitted with lower than Priority.HIGHEST.
               A job is transferred from passive to active queue only when the
               active queue size is less than 'workers_size'.
+    A job for an ID and function already waiting in a queue with the same or
+    higher priority is coalesced with the waiting one.
 
     Keyword arguments:
     active_size -- the size of the active queue
@@ -51,6 +56,9 @@ class Runner(object):
         self._passive = eventlet.queue.PriorityQueue(maxsize=passive_size)
         self._workers = eventlet.greenpool.GreenPool(size=workers_size)
         self._idle = workers_size
+        # Number of waiting jobs by (function, ID) and priority
+        self._pending = collections.defaultdict(collections.Counter)
+        self._coalesced = 0
 
     def run(self, priority, ids, fn):
         """ Submit a job with priority
@@ -62,12 +70,19 @@ class Runner(object):
         """
         for jid in ids:
             try:
+                key = (fn, jid)
+                pending = self._pending.get(key)
+                if pending and min(pending) <= priority.value:
+                    self._coalesced += 1
+                    LOG.debug(MESSAGE.format(jid, priority, "coalesced"))
+                    continue
                 LOG.info(MESSAGE.format(jid, priority, "enqueued"))
                 item = (priority.value, {"id": jid, "fn": fn})
                 if priority.value == Priority.HIGHEST:
                     self._active.put_nowait(item)
                 else:
                     self._passive.put_nowait(item)
+                self._pending[key][priority.value] += 1
             except eventlet.queue.Full as err:
                 LOG.error(MESSAGE.format(jid, priority, err))
 
@@ -78,14 +93,26 @@ class Runner(object):
                     self._active.put_nowait(self._passive.get_nowait())
                 priority_value, job = self._active.get(block=True,
                                                        timeout=TIMEOUT)
-                LOG.debug(MESSAGE.format(job["id"], priority_value, "started"))
-                self._workers.spawn_n(job["fn"], job["id"])
+                self._dispatch(priority_value, job)
             except eventlet.queue.Empty:
                 LOG.info("No activity for the last {} seconds".format(TIMEOUT))
             except Exception as err:
                 # Continue on error. Otherwise the agent operation will stop
                 LOG.error(err)
 
+    def _dispatch(self, priority_value, job):
+        LOG.debug(MESSAGE.format(job["id"], priority_value, "started"))
+        # Submissions from now on are not covered by this run, but they are
+        # still covered by other waiting jobs for the same ID and function
+        key = (job["fn"], job["id"])
+        pending = self._pending[key]
+        pending[priority_value] -= 1
+        if pending[priority_value] <= 0:
+            del pending[priority_value]
+        if not pending:
+            del self._pending[key]
+        self._workers.spawn_n(job["fn"], job["id"])
+
     def active(self):
         """ Returns that size of the active queue """
         return self._active.qsize()
@@ -94,6 +121,10 @@ class Runner(object):
         """ Returns that size of the passive queue """
         return self._passive.qsize()
 
+    def coalesced(self):
+        """ Returns the number of jobs coalesced with waiting ones """
+        return self._coalesced
+
     def start(self):
         """ Initialize the runner instance """
         eventlet.greenthread.spawn_n(self._start)
@@ -103,6 +134,49 @@ class Runner(object):
         self._workers.waitall()
 
 
+class ReaderWriterLock(object):
+    """ Synchronization.ReaderWriterLock.class allows many concurrent readers
+        or a single writer of the 'with' section. A waiting writer is served
+        before the readers arriving after it.
+
+        Usage:
+        with lock.read(): ...
+        with lock.write(): ...
+    """
+
+    def __init__(self):
+        self._readers = 0
+        self._readers_semaphore = eventlet.semaphore.Semaphore(value=1)
+        self._writer_semaphore = eventlet.semaphore.Semaphore(value=1)
+        # Held by a writer while it waits, so new readers queue behind it
+        self._turnstile = eventlet.semaphore.Semaphore(value=1)
+
+    @contextlib.contextmanager
+    def read(self):
+        with self._turnstile:
+            with self._readers_semaphore:
+                self._readers += 1
+                if self._readers == 1:
+                    # The first reader locks out the writers
+                    self._writer_semaphore.acquire()
+        try:
+            yield self
+        finally:
+            with self._readers_semaphore:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._writer_semaphore.release()
+
+    @contextlib.contextmanager
+    def write(self):
+        with self._turnstile:
+            self._writer_semaphore.acquire()
+        try:
+            yield self
+        finally:
+            self._writer_semaphore.release()
+
+
 class Scheduler(object):
     """ Synchronization.Scheduler.class limits the rate of execution of
         'with' section
@@ -155,8 +155,8 @@ def get_qos_dscp_rules(context, qos_id):
     ).all()
 
 
-def get_port(context, port_id):
-    result = context.session.query(
+def _get_ports_query(context):
+    return context.session.query(
         Port.id,
         Port.mac_address,
         Port.admin_state_up,
@@ -165,19 +165,71 @@ def get_port(context, port_id):
         StandardAttribute.revision_number,
         PortBinding.host,
         PortBinding.vif_details,
-    ).filter(
-        Port.id == port_id
     ).join(
         StandardAttribute,
         PortBinding,
     ).outerjoin(
         QosPortPolicyBinding,
         QosPolicy
+    )
+
+
+def get_port(context, port_id):
+    result = _get_ports_query(context).filter(
+        Port.id == port_id
     ).one_or_none()
     return _validate_one(result,
                          "Port ID='{}'".format(port_id))
 
 
+def get_port_full(context, port_id):
+    with context.session.begin(subtransactions=True):
+        return (
+            get_port(context, port_id),
+            get_port_addresses(context, port_id),
+            get_port_allowed_pairs(context, port_id),
+            get_port_security_groups(context, port_id)
+        )
+
+
+def get_ports_full(context, port_ids):
+    ports = {}
+    with context.session.begin(subtransactions=True):
+        for port in _get_ports_query(context).filter(
+                Port.id.in_(port_ids)).all():
+            ports[port[0]] = (port, [], [], [])
+
+        for port_id, ip, subnet in context.session.query(
+            IPAllocation.port_id,
+            IPAllocation.ip_address,
+            IPAllocation.subnet_id
+        ).filter(
+            IPAllocation.port_id.in_(port_ids)
+        ).all():
+            if port_id in ports:
+                ports[port_id][1].append((ip, subnet))
+
+        for port_id, ip, mac in context.session.query(
+            AllowedAddressPair.port_id,
+            AllowedAddressPair.ip_address,
+            AllowedAddressPair.mac_address
+        ).filter(
+            AllowedAddressPair.port_id.in_(port_ids)
+        ).all():
+            if port_id in ports:
+                ports[port_id][2].append((ip, mac))
+
+        for port_id, sg_id in context.session.query(
+            sg_db.SecurityGroupPortBinding.port_id,
+            sg_db.SecurityGroupPortBinding.security_group_id
+        ).filter(
+            sg_db.SecurityGroupPortBinding.port_id.in_(port_ids)
+        ).all():
+            if port_id in ports:
+                ports[port_id][3].append((sg_id,))
+    return ports
+
+
 def get_port_security_groups(context, port_id):
     return context.session.query(
         sg_db.SecurityGroupPortBinding.security_group_id
@@ -1,12 +1,15 @@
 import datetime
 import json
+import operator
 import os
 import sys
+import threading
 import traceback
 import time
 
-import netaddr
+import eventlet
 import oslo_messaging
+import six
 
 from com.vmware.nsx_client import TransportZones
 from com.vmware.nsx.model_client import (FirewallRule,
@@ -36,13 +39,29 @@ from networking_nsxv3.common import synchronization as sync
 # Eventlet Best Practices
 # https://specs.openstack.org/openstack/openstack-specs/specs/eventlet-best-practices.html
 if not os.environ.get('DISABLE_EVENTLET_PATCHING'):
-    import eventlet
     eventlet.monkey_patch()
 
+# Optional faster JSON codec
+try:
+    import orjson
+
+    def json_loads(data):
+        return orjson.loads(data)
+
+    def json_dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
 LOG = logging.getLogger(__name__)
 
 AGENT_SYNCHRONIZATION_LOCK = "AGENT_SYNCHRONIZATION_LOCK"
 
+SECURITY_GROUP_RULE_ATTRIBUTES = (
+    "id", "port_range_min", "port_range_max", "protocol", "ethertype",
+    "direction", "remote_group_id", "remote_ip_prefix", "security_group_id")
+
 
 def is_migration_enabled():
     return cfg.CONF.AGENT.enable_runtime_migration_from_dvs_driver
@@ -62,90 +81,169 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
         self.nsxv3 = nsxv3
         self.vsphere = vsphere
         self.rpc = rpc
+        # NSX revisions shared by all synchronization workers
+        self._revisions_cache = {}
+        # Security Groups being deleted, guarded by the lock
+        self._inflight_deletes = set()
+        self._inflight_deletes_lock = threading.Lock()
+        # Ports content prefetched by the shallow synchronization
+        self._ports_full = {}
+        # Set by changes notified over RPC since the last synchronization
+        self._dirty = threading.Event()
+        # NSX logical switch IDs by segmentation ID, with their fetch time
+        self._switch_ids = {}
         self.runner = sync.Runner(
             workers_size=cfg.CONF.NSXV3.nsxv3_concurrent_requests)
         self.runner.start()
 
-    def security_group_updated(self, security_group_id):
+    # The Security Group callbacks below accept optionally
+    # security_group -- the NSX objects (ipset, nsg, sec) of the group
+    # lock -- the group lock, when the caller already holds it for writing
+    # Neutron is read in the same write section that updates NSX, so an
+    # older state is never applied after a newer one
+    def security_group_updated(self, security_group_id, security_group=None,
+                               lock=None):
         sg_id = str(security_group_id)
         LOG.debug("Updating Security Group '{}'".format(sg_id))
-        with LockManager.get_lock(sg_id):
-            self.nsxv3.get_or_create_security_group(sg_id)
-
+        lock = lock or LockManager.get_rwlock(sg_id)
+        with lock.write():
             tcp_strict_enabled = self.rpc.has_security_group_tag(
                 security_group_id, nsxv3_constants.NSXV3_CAPABILITY_TCP_STRICT)
+            if security_group is None:
+                self.nsxv3.get_or_create_security_group(sg_id)
             self.nsxv3.update_security_group_capabilities(sg_id,
                                                           [tcp_strict_enabled])
 
-    def security_group_member_updated(self, security_group_id):
+    def security_group_member_updated(self, security_group_id,
+                                      security_group=None, lock=None):
         sg_id = str(security_group_id)
         LOG.debug("Updating Security Group '{}' members".format(sg_id))
-        with LockManager.get_lock(sg_id):
-            self.nsxv3.get_or_create_security_group(sg_id)
+        lock = lock or LockManager.get_rwlock(sg_id)
+        with lock.write():
             ip1 = self.rpc.get_security_group_members_ips(sg_id)
             ip2 = self.rpc.get_security_group_members_address_bindings_ips(
                 sg_id)
-
-            members = [str(ip) for ip in netaddr.IPSet(
-                [str(ip[0]) for ip in ip1 + ip2]).iter_cidrs()]
+            members = nsxv3_utils.aggregate_ips(
+                [ip[0] for ip in ip1 + ip2],
+                backend=cfg.CONF.AGENT.security_group_members_aggregation)
+            if security_group is None:
+                self.nsxv3.get_or_create_security_group(sg_id)
             self.nsxv3.update_security_group_members(sg_id, members)
 
-    def security_group_rule_updated(self, security_group_id):
+    def security_group_rule_updated(self, security_group_id,
+                                    security_group=None, lock=None):
         sg_id = str(security_group_id)
         LOG.debug("Updating Security Group '{}' rules".format(sg_id))
-        with LockManager.get_lock(sg_id):
-            (ipset, nsg, sec) = self.nsxv3.get_or_create_security_group(sg_id)
-            _, revs_ips, _ = self.nsxv3.get_revisions(IPSet())
-            _, revs_fwr, meta_fwr = self.nsxv3.get_revisions(
-                FirewallRule(),
-                attr_key="section_id",
-                attr_val=sec.id)
+        lock = lock or LockManager.get_rwlock(sg_id)
+        with lock.write():
+            if security_group is None:
+                security_group = self.nsxv3.get_or_create_security_group(
+                    sg_id)
+            (ipset, nsg, sec) = security_group
 
             neutron_rules = self.rpc.get_rules_for_security_groups_id(sg_id)
+            (_, revision) = self.rpc.get_security_group_revision(sg_id)
 
-            attrs = ["id", "port_range_min", "port_range_max", "protocol",
-                     "ethertype", "direction", "remote_group_id",
-                     "remote_ip_prefix", "security_group_id"]
-
-            add_rules = []
-            for rule in neutron_rules:
-                name = rule["id"]
-                remote_group_id = rule["remote_group_id"]
-
-                fwr = dict()
-                for key in attrs:
-                    fwr[key] = rule[key]
-
-                fwr["local_group_id"] = ipset.id
-                fwr["apply_to"] = nsg.id
-                if remote_group_id in revs_ips:
-                    fwr["remote_group_id"] = revs_ips[remote_group_id]
-
-                if name in revs_fwr:
-                    # If the rule is disabled recreate it
-                    if not meta_fwr.get(name).get("FirewallRule.disabled"):
-                        del revs_fwr[name]
-                        continue
-
-                fwr_spec = self.nsxv3.get_security_group_rule_spec(fwr)
-                if fwr_spec:
-                    add_rules.append(fwr_spec)
-            del_rules = revs_fwr.values()
-
-            (sg_id, revision) = self.rpc.get_security_group_revision(sg_id)
+            _, revs_ips, _ = self._cached_get_revisions(IPSet())
+            remote_ids = set(r["remote_group_id"] for r in neutron_rules
+                             if r["remote_group_id"])
+            if not remote_ids.issubset(revs_ips):
+                # Referenced IP Sets may have been created after caching
+                self._invalidate_revisions(IPSet())
+                _, revs_ips, _ = self._cached_get_revisions(IPSet())
 
+            _, revs_fwr, meta_fwr = self.nsxv3.get_revisions(
+                sdk_model=FirewallRule(),
+                attr_key="section_id",
+                attr_val=sec.id)
+            add_rules, del_rules = self._get_security_group_rules_diff(
+                neutron_rules, ipset, nsg, revs_ips, revs_fwr, meta_fwr)
             self.nsxv3.update_security_group_rules(
                 sg_id,
                 revision_number=revision,
                 add_rules=add_rules,
                 del_rules=del_rules)
 
+    def _get_security_group_rules_diff(self, neutron_rules, ipset, nsg,
+                                       revs_ips, revs_fwr, meta_fwr):
+        """Returns the NSX rules to be created and the NSX rule IDs to be
+        removed in order to match the Neutron rules.
+        """
+        attrs = SECURITY_GROUP_RULE_ATTRIBUTES
+        get_values = operator.itemgetter(*attrs)
+        get_rule_spec = self.nsxv3.get_security_group_rule_spec
+
+        # A single scratch record is reused for all rules as the rule spec
+        # does not keep a reference to it
+        fwr = dict.fromkeys(attrs)
+        fwr["local_group_id"] = ipset.id
+        fwr["apply_to"] = nsg.id
+
+        # Enabled NSX rules are kept, disabled ones are recreated
+        keep = frozenset(
+            name for name in revs_fwr
+            if not meta_fwr[name].get("FirewallRule.disabled"))
+        kept = keep.intersection(rule["id"] for rule in neutron_rules)
+
+        # Allocated once for the worst case and trimmed at the end
+        add_rules = [None] * len(neutron_rules)
+        n = 0
+        for rule in neutron_rules:
+            if rule["id"] in kept:
+                continue
+
+            fwr.update(zip(attrs, get_values(rule)))
+            remote_group_id = fwr["remote_group_id"]
+            if remote_group_id in revs_ips:
+                fwr["remote_group_id"] = revs_ips[remote_group_id]
+
+            fwr_spec = get_rule_spec(fwr)
+            if fwr_spec:
+                add_rules[n] = fwr_spec
+                n += 1
+        del add_rules[n:]
+
+        del_rules = [revs_fwr[name]
+                     for name in six.viewkeys(revs_fwr) - kept]
+        return add_rules, del_rules
+
     def security_group_delete(self, security_group_id):
-        with LockManager.get_lock(security_group_id):
+        # NSX deletes are idempotent, only avoid running them in parallel
+        with self._inflight_deletes_lock:
+            if security_group_id in self._inflight_deletes:
+                LOG.debug("Security Group '{}' is already being deleted"
+                          .format(security_group_id))
+                return
+            self._inflight_deletes.add(security_group_id)
+        try:
             self.nsxv3.delete_security_group(security_group_id)
+            self._invalidate_revisions(IPSet())
+        finally:
+            with self._inflight_deletes_lock:
+                self._inflight_deletes.discard(security_group_id)
+
+    def _cached_get_revisions(self, sdk_model, attr_key=None, attr_val=None):
+        key = (sdk_model.__class__.__name__, attr_key, attr_val)
+        entry = self._revisions_cache.get(key)
+        now = time.time()
+        if entry and now - entry[0] < cfg.CONF.AGENT.polling_interval:
+            return entry[1]
+        revisions = self.nsxv3.get_revisions(
+            sdk_model=sdk_model, attr_key=attr_key, attr_val=attr_val)
+        self._revisions_cache[key] = (now, revisions)
+        return revisions
+
+    def _invalidate_revisions(self, sdk_model=None, attr_key=None,
+                              attr_val=None):
+        if sdk_model is None:
+            self._revisions_cache.clear()
+        else:
+            key = (sdk_model.__class__.__name__, attr_key, attr_val)
+            self._revisions_cache.pop(key, None)
 
     # RPC method
     def security_groups_member_updated(self, context, **kwargs):
+        self._set_dirty(context)
         o = kwargs["security_groups"]
         self.runner.run(sync.Priority.HIGHEST,
                         o if isinstance(o, list) else [o],
@@ -153,12 +251,15 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
 
     # RPC method
     def security_groups_rule_updated(self, context, **kwargs):
+        self._set_dirty(context)
         o = kwargs["security_groups"]
         self.runner.run(sync.Priority.HIGHEST,
                         o if isinstance(o, list) else [o],
                         self.security_group_rule_updated)
 
     def _sync_inventory_full(self):
+        # Recover from logical switches changed outside of the agent
+        self._switch_ids.clear()
         self.runner.run(
             sync.Priority.HIGHER,
             self.get_revisions(
@@ -177,9 +278,18 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
         qos_query = self.rpc.get_qos_policy_revision_tuples
         port_query = self.rpc.get_port_revision_tuples
 
+        # Collect the revisions of all object types concurrently
+        sg_content = eventlet.spawn(
+            self._sync_get_content, sdk_model=IPSet(), os_query=sg_query)
+        qos_content = eventlet.spawn(
+            self._sync_get_content,
+            sdk_model=QosSwitchingProfile(), os_query=qos_query)
+        port_content = eventlet.spawn(
+            self._sync_get_content, sdk_model=LogicalPort(),
+            os_query=port_query)
+
         # Security Groups Synchronization
-        outdated_ips, orphaned_ips = self._sync_get_content(
-            sdk_model=IPSet(), os_query=sg_query)
+        outdated_ips, orphaned_ips = sg_content.wait()
         self.runner.run(
             sync.Priority.HIGHER,
             outdated_ips, self.security_group_updated)
@@ -196,15 +306,14 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
             orphaned_ips, self.sync_security_group_orphaned)
 
         # QoS Policies Synchronization
-        outdated_qos, orphaned_qos = self._sync_get_content(
-            sdk_model=QosSwitchingProfile(), os_query=qos_query)
+        outdated_qos, orphaned_qos = qos_content.wait()
         self.runner.run(
             sync.Priority.LOWER,
             outdated_qos, self.sync_qos)
 
         # Ports Synchronization
-        outdated_lps, orphaned_lps = self._sync_get_content(
-            sdk_model=LogicalPort(), os_query=port_query)
+        outdated_lps, orphaned_lps = port_content.wait()
+        self._sync_get_ports(outdated_lps)
         self.runner.run(
             sync.Priority.LOW,
             outdated_lps, self.sync_port)
@@ -217,27 +326,54 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
         self._sync_report("Ports", outdated_lps, orphaned_lps)
 
     def sync_inventory(self):
-        m = "Synchronization events pools size HIGHPRIORITY={} LOWPRIORITY={}"
+        m = "Synchronization events pools size HIGHPRIORITY={} LOWPRIORITY={}"\
+            " COALESCED={}"
 
         with LockManager.get_lock(AGENT_SYNCHRONIZATION_LOCK):
-            LOG.info(m.format(self.runner.active(), self.runner.passive()))
+            LOG.info(m.format(self.runner.active(), self.runner.passive(),
+                              self.runner.coalesced()))
 
             if self.runner.passive() > 0:
                 return
 
-            timestamp = nsxv3_facada.Timestamp(
-                "last_full_synchronization",
-                self.nsxv3, TransportZones,
-                TransportZone(display_name=self.nsxv3.tz_name),
-                cfg.CONF.AGENT.sync_full_schedule)
+            # Cleared before synchronizing, so changes notified meanwhile
+            # are synchronized again
+            self._dirty.clear()
+            self._invalidate_revisions()
+            # Drop the content prefetched for jobs that never ran
+            self._ports_full.clear()
 
-            if timestamp.has_expired():
-                LOG.info("Starting a full inventory synchronization")
-                self._sync_inventory_full()
-                timestamp.update()
-            else:
-                LOG.info("Starting a shallow inventory synchronization")
-                self._sync_inventory_shallow()
+            try:
+                timestamp = nsxv3_facada.Timestamp(
+                    "last_full_synchronization",
+                    self.nsxv3, TransportZones,
+                    TransportZone(display_name=self.nsxv3.tz_name),
+                    cfg.CONF.AGENT.sync_full_schedule)
+
+                if timestamp.has_expired():
+                    LOG.info("Starting a full inventory synchronization")
+                    self._sync_inventory_full()
+                    timestamp.update()
+                else:
+                    LOG.info("Starting a shallow inventory synchronization")
+                    self._sync_inventory_shallow()
+            except Exception:
+                # Retry on the next polling interval
+                self._dirty.set()
+                raise
+
+    def _set_dirty(self, context):
+        # Calls without context are issued by the synchronization itself
+        if context is not None:
+            self._dirty.set()
+
+    def is_dirty(self):
+        return self._dirty.is_set()
+
+    def _discard_port_full(self, context, port_id):
+        # A notified change supersedes the content prefetched for the port
+        if context is not None:
+            self._ports_full.pop(port_id, None)
 
     def _sync_report(self, object_name, outdated, orphaned):
         report = dict()
@@ -246,23 +382,42 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
         LOG.info("Synchronizing {} {}".format(object_name, report))
 
     def _sync_get_content(self, sdk_model, os_query):
+        nsx_content = eventlet.spawn(
+            self.nsxv3.get_revisions, sdk_model=sdk_model)
         revs_os = self.get_revisions(query=os_query)
-        revs_nsx, _, _ = self.nsxv3.get_revisions(sdk_model=sdk_model)
-
-        outdated = set()
+        revs_nsx, _, _ = nsx_content.wait()
 
-        for key, rev in revs_os.items():
-            if revs_nsx.get(key) != rev:
-                outdated.add(key)
-
-        orphaned = set(revs_nsx.keys()).difference(revs_os.keys())
+        os_items = six.viewitems(revs_os) - six.viewitems(revs_nsx)
+        outdated = set(key for key, _ in os_items)
+        orphaned = six.viewkeys(revs_nsx) - six.viewkeys(revs_os)
         return outdated, orphaned
 
+    def _sync_get_ports(self, port_ids):
+        # Fetch the content of all ports with one RPC per page
+        if not self.rpc.can_get_port_full():
+            return
+        port_ids = list(port_ids)
+        limit = cfg.CONF.AGENT.rpc_max_records_per_query
+        for i in range(0, len(port_ids), limit):
+            self._ports_full.update(
+                self.rpc.get_ports_full(port_ids[i:i + limit]))
+
     def sync_port(self, port_id):
         LOG.debug("Synching port '{}'.".format(port_id))
 
+        port_full = self._ports_full.pop(port_id, None)
+        if port_full is None:
+            if self.rpc.can_get_port_full():
+                port_full = self.rpc.get_port_full(port_id)
+            else:
+                port_full = (
+                    self.rpc.get_port(port_id),
+                    self.rpc.get_port_addresses(port_id),
+                    self.rpc.get_port_allowed_pairs(port_id),
+                    self.rpc.get_port_security_groups(port_id))
+        (port_tuple, addresses, pairs, security_groups) = port_full
         (id, mac, up, status, qos_id, rev,
-         binding_host, vif_details) = self.rpc.get_port(port_id)
+         binding_host, vif_details) = port_tuple
         port = {
             "id": id,
             "mac_address": mac,
@@ -278,13 +433,13 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
             portbindings.VIF_TYPE: portbindings.VIF_TYPE_OVS
         }
 
-        segmentation_id = json.loads(vif_details).get("segmentation_id")
+        segmentation_id = json_loads(vif_details).get("segmentation_id")
 
-        for ip, subnet in self.rpc.get_port_addresses(port_id):
+        for ip, subnet in addresses:
             port["fixed_ips"].append(
                 {"ip_address": ip, "mac_address": mac, "subnet_id": subnet})
 
-        for (ip, mac) in self.rpc.get_port_allowed_pairs(port_id):
+        for (ip, mac) in pairs:
             # TODO - fix in future.
             # NSX-T does not support CIDR as port manual binding
             if "/" in ip:
@@ -292,7 +447,7 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
             port["allowed_address_pairs"].append(
                 {"ip_address": ip, "mac_address": mac})
 
-        for (sg_id,) in self.rpc.get_port_security_groups(port_id):
+        for (sg_id,) in security_groups:
             port["security_groups"].append(sg_id)
 
         self.port_update(context=None, port=port,
@@ -327,15 +482,7 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
             "revision_number": qos_revision_number,
             "rules": rules
         }
-        try:
-            self.create_policy(context=None, policy=policy)
-        except Exception as e:
-            if "Object exists" not in str(e):
-                LOG.error("Unable to create policy '{}'".format(qos_id))
-        # try:
-        self.update_policy(context=None, policy=policy)
-        # except Exception as e:
-        #     LOG.error("Unable to update policy '{}'".format(e))
+        self._create_and_update_policy(policy)
 
     def sync_qos_orphaned(self, qos_id):
         LOG.debug("Removing orphaned QoS Policy '{}'.".format(qos_id))
@@ -347,10 +494,17 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
 
     def sync_security_group(self, security_group_id, update_rules=True):
         LOG.debug("Synching Security Group '{}'.".format(security_group_id))
-        self.security_group_updated(security_group_id)
-        self.security_group_member_updated(security_group_id)
-        if update_rules:
-            self.security_group_rule_updated(security_group_id)
+        sg_id = str(security_group_id)
+        # Lookup the NSX objects and take the lock once for all updates
+        with LockManager.get_rwlock(sg_id).write() as lock:
+            security_group = self.nsxv3.get_or_create_security_group(sg_id)
+            self.security_group_updated(
+                sg_id, security_group=security_group, lock=lock)
+            self.security_group_member_updated(
+                sg_id, security_group=security_group, lock=lock)
+            if update_rules:
+                self.security_group_rule_updated(
+                    sg_id, security_group=security_group, lock=lock)
 
     def sync_security_group_orphaned(self, security_group_id):
         LOG.debug("Removing orphaned security group '{}'.".format(
@@ -363,11 +517,10 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
         created_after = datetime.datetime(1970, 1, 1)
         while True:
             pr_tuples = query(limit=limit, created_after=created_after)
-            for port, revision, _ in pr_tuples:
-                rev[port] = str(revision)
+            rev.update((id, revision) for id, revision, _ in pr_tuples)
             if len(pr_tuples) < limit:
                 break
-            created_after = pr_tuples.pop()[2]
+            created_after = pr_tuples[-1][2]
         return rev
 
     def get_network_bridge(
@@ -382,17 +535,34 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
             if seg_id:
                 LOG.debug("Retrieving bridge for segmentation_id={}"
                           .format(seg_id))
-                lock_id = nsxv3_utils.get_segmentation_id_lock(seg_id)
-                with LockManager.get_lock(lock_id):
-                    id = self.nsxv3.get_switch_id_for_segmentation_id(seg_id)
-                    return {
-                        'nsx-logical-switch-id': id,
-                        'segmentation_id': seg_id
-                    }
+                return {
+                    'nsx-logical-switch-id': self._get_switch_id(seg_id),
+                    'segmentation_id': seg_id
+                }
         return {}
 
+    def _get_switch_id(self, segmentation_id):
+        # Cache hits take no lock, the lock is taken only on a miss. Entries
+        # expire after polling_interval, so a switch deleted in NSX is
+        # recreated by a later binding
+        key = str(segmentation_id)
+        ttl = cfg.CONF.AGENT.polling_interval
+        entry = self._switch_ids.get(key)
+        if entry is None or time.time() - entry[0] >= ttl:
+            lock_id = nsxv3_utils.get_segmentation_id_lock(segmentation_id)
+            with LockManager.get_lock(lock_id):
+                entry = self._switch_ids.get(key)
+                now = time.time()
+                if entry is None or now - entry[0] >= ttl:
+                    id = self.nsxv3.get_switch_id_for_segmentation_id(
+                        segmentation_id)
+                    entry = self._switch_ids[key] = (now, id)
+        return entry[1]
+
     def port_update(self, context, port=None, network_type=None,
                     physical_network=None, segmentation_id=None):
+        self._set_dirty(context)
+        self._discard_port_full(context, port["id"])
         vnic_type = port.get(portbindings.VNIC_TYPE)
         vif_type = port.get(portbindings.VIF_TYPE)
         if not ((vnic_type and vnic_type == portbindings.VNIC_NORMAL) and
@@ -429,6 +599,8 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
 
     def port_delete(self, context, **kwargs):
         LOG.debug("Deleting port " + str(kwargs))
+        self._set_dirty(context)
+        self._discard_port_full(context, kwargs.get("port_id"))
         if kwargs.get("sync"):
             with LockManager.get_lock(kwargs["port_id"]):
                 self.nsxv3.port_delete(kwargs["port_id"])
@@ -436,19 +608,37 @@ class NSXv3AgentManagerRpcCallBackBase(amb.CommonAgentManagerRpcCallBackBase):
 
     def create_policy(self, context, policy):
         LOG.debug("Creating policy={}.".format(policy["name"]))
+        self._set_dirty(context)
         with LockManager.get_lock(policy["id"]):
             self.nsxv3.create_switch_profile_qos(
                 policy["id"], policy["revision_number"])
 
     def update_policy(self, context, policy):
         LOG.debug("Updating policy={}.".format(policy["name"]))
+        self._set_dirty(context)
         with LockManager.get_lock(policy["id"]):
             self.nsxv3.update_switch_profile_qos(context, policy["id"],
                                                  policy["revision_number"],
                                                  policy["rules"])
 
+    def _create_and_update_policy(self, policy):
+        # Hold the policy lock across both calls so that no other update
+        # can slip in between the creation and the update
+        with LockManager.get_lock(policy["id"]):
+            try:
+                self.nsxv3.create_switch_profile_qos(
+                    policy["id"], policy["revision_number"])
+            except Exception as e:
+                if "Object exists" not in str(e):
+                    LOG.error("Unable to create policy '{}'".format(
+                        policy["id"]))
+            self.nsxv3.update_switch_profile_qos(None, policy["id"],
+                                                 policy["revision_number"],
+                                                 policy["rules"])
+
     def delete_policy(self, context, policy):
         LOG.debug("Deleting policy={}.".format(policy["name"]))
+        self._set_dirty(context)
         with LockManager.get_lock(policy["id"]):
             pass
             # TODO self.nsxv3.delete_switch_profile_qos(policy["id"])
@@ -490,7 +680,13 @@ class NSXv3Manager(amb.CommonAgentManagerBase):
                 # will not be called more often than the sync loop
                 now = time.time()
                 elapsed = (time.time() - self.last_sync_time)
-                if elapsed > cfg.CONF.AGENT.polling_interval:
+                interval = cfg.CONF.AGENT.polling_interval
+                safety_interval = interval * \
+                    cfg.CONF.AGENT.sync_safety_polling_intervals
+                # Synchronize only after notified changes, or periodically
+                # as a safety net for changes missed by the notifications
+                if elapsed > interval and (self.rpc.is_dirty() or
+                                           elapsed > safety_interval):
                     self.rpc.sync_inventory()
                     self.last_sync_time = now
             except Exception:
@@ -654,7 +850,7 @@ def cli_sync():
         "qos_policies": qs_status
     }
 
-    LOG.info(json.dumps(result))
+    LOG.info(json_dumps(result))
 
     return 1 if pt_error or sg_error or qs_error else 0
 
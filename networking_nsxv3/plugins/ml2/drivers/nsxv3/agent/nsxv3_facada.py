@@ -1,4 +1,5 @@
 import ipaddress
+import eventlet
 from oslo_log import log as logging
 from oslo_config import cfg
 import copy
@@ -35,6 +36,9 @@ from com.vmware.nsx.model_client import IPSet
 from com.vmware.nsx.model_client import NSGroup
 from com.vmware.nsx.model_client import NSGroupTagExpression
 
+from com.vmware.vapi.std.errors_client import NotFound
+from com.vmware.vapi.std.errors_client import ServiceUnavailable
+
 from networking_nsxv3.common import constants as nsxv3_constants
 from networking_nsxv3.plugins.ml2.drivers.nsxv3.agent import nsxv3_client
 from networking_nsxv3.plugins.ml2.drivers.nsxv3.agent import nsxv3_utils
@@ -591,11 +595,33 @@ class NSXv3Facada(nsxv3_client.NSXv3ClientImpl):
         ips_spec = IPSet(display_name=security_group_id)
         nsg_spec = NSGroup(display_name=security_group_id)
 
-        self.delete(sdk_service=Sections, sdk_model=sec_spec)
-        self.delete(sdk_service=IpSets, sdk_model=ips_spec)
-        self.delete(sdk_service=NsGroups, sdk_model=nsg_spec)
+        self._delete_idempotent(sdk_service=Sections, sdk_model=sec_spec)
+        self._delete_idempotent(sdk_service=IpSets, sdk_model=ips_spec)
+        self._delete_idempotent(sdk_service=NsGroups, sdk_model=nsg_spec)
         return True
 
+    def _delete_idempotent(self, sdk_service, sdk_model):
+        # Objects removed concurrently are considered deleted and throttled
+        # requests are retried
+        retry_max = cfg.CONF.NSXV3.nsxv3_operation_retry_count
+        retry_sleep = cfg.CONF.NSXV3.nsxv3_operation_retry_sleep
+        for attempt in range(1, retry_max + 1):
+            try:
+                return self.delete(sdk_service=sdk_service,
+                                   sdk_model=sdk_model)
+            except NotFound:
+                LOG.warning("'{}' display_name='{}' already deleted.".format(
+                    sdk_model.__class__.__name__, sdk_model.display_name))
+                return sdk_model
+            except ServiceUnavailable:
+                if attempt == retry_max:
+                    raise
+                LOG.warning("Deleting '{}' display_name='{}' was throttled. "
+                            "Retrying in {}s.".format(
+                                sdk_model.__class__.__name__,
+                                sdk_model.display_name, retry_sleep))
+                eventlet.sleep(retry_sleep)
+
     def update_security_group_members(self, security_group_id, member_cidrs):
         ips_spec = IPSet(display_name=security_group_id)
         ips = self.get(sdk_service=IpSets, sdk_model=ips_spec)
@@ -801,11 +827,16 @@ class NSXv3Facada(nsxv3_client.NSXv3ClientImpl):
                             continue
                 else:
                     name = obj.get("display_name")
-                revision = ""
+                revision = None
                 if 'tags' in obj:
                     for tag in obj.get("tags"):
                         if tag.get("scope") == rev_scope:
-                            revision = tag.get("tag")
+                            # Revisions are compared as integers with the
+                            # Neutron revision numbers
+                            try:
+                                revision = int(tag.get("tag"))
+                            except (TypeError, ValueError):
+                                pass
                             break
                 if 'FirewallRule' in sdk_type:
                     metadata[name] = {
@@ -16,8 +16,14 @@
 # Instead, to create sections,
 # use: POST /api/v1/firewall/sections To create rules,
 # use: POST /api/v1/firewall/sections/<section-id>/rules
+import ipaddress
+import socket
+import struct
 from uuid import UUID
 
+import netaddr
+import six
+
 
 def get_firewall_rule(sdk_model):
     rule = {}
@@ -79,3 +85,108 @@ def is_valid_uuid(uuid, version=4):
 
 def get_segmentation_id_lock(segmentation_id):
     return "segmentation_id-{}".format(segmentation_id)
+
+
+def aggregate_ips(ips, backend="ranges"):
+    """Aggregate IP addresses and CIDRs into the minimal list of CIDRs
+
+    The "ranges" backend merges host addresses and networks as integer
+    ranges, the standard library only parses the networks. The "netaddr"
+    backend keeps the original netaddr.IPSet aggregation for regression
+    comparison.
+    """
+    if backend == "netaddr":
+        return [str(cidr) for cidr in netaddr.IPSet(ips).iter_cidrs()]
+
+    hosts = []
+    networks = {socket.AF_INET: [], socket.AF_INET6: []}
+    for ip in ips:
+        if "/" in ip:
+            net = ipaddress.ip_network(six.text_type(ip), strict=False)
+            family = socket.AF_INET if net.version == 4 else socket.AF_INET6
+            networks[family].append(
+                (int(net.network_address), int(net.broadcast_address)))
+        else:
+            hosts.append(ip)
+    if not networks[socket.AF_INET] and not networks[socket.AF_INET6]:
+        return coalesce_ips(hosts)
+    values = _parse_ips(hosts)
+
+    cidrs = []
+    for family, width in ((socket.AF_INET, 32), (socket.AF_INET6, 128)):
+        ranges = _merge_ranges(
+            list(_host_runs(values[family])) + networks[family])
+        for start, end in ranges:
+            _append_range_cidrs(cidrs, family, width, start, end)
+    return cidrs
+
+
+def coalesce_ips(ips):
+    """Coalesce host IP addresses into the minimal list of CIDRs
+
+    The addresses are parsed into integers, sorted and contiguous runs are
+    split into the largest aligned CIDR blocks. IPv4 blocks come first.
+    """
+    values = _parse_ips(ips)
+    cidrs = []
+    for family, width in ((socket.AF_INET, 32), (socket.AF_INET6, 128)):
+        for start, end in _host_runs(values[family]):
+            _append_range_cidrs(cidrs, family, width, start, end)
+    return cidrs
+
+
+def _parse_ips(ips):
+    values = {socket.AF_INET: set(), socket.AF_INET6: set()}
+    for ip in ips:
+        ip = str(ip)
+        if ":" in ip:
+            high, low = struct.unpack(
+                "!QQ", socket.inet_pton(socket.AF_INET6, ip))
+            values[socket.AF_INET6].add(high << 64 | low)
+        else:
+            values[socket.AF_INET].add(struct.unpack(
+                "!I", socket.inet_pton(socket.AF_INET, ip))[0])
+    return values
+
+
+def _host_runs(values):
+    # Ranges of consecutive values, in ascending order
+    ordered = sorted(values)
+    i = 0
+    while i < len(ordered):
+        start = end = ordered[i]
+        i += 1
+        while i < len(ordered) and ordered[i] == end + 1:
+            end = ordered[i]
+            i += 1
+        yield start, end
+
+
+def _merge_ranges(ranges):
+    # Overlapping and adjacent ranges are merged
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _append_range_cidrs(cidrs, family, width, start, end):
+    while start <= end:
+        # The largest block aligned on start and not exceeding end
+        size = (end - start + 1).bit_length() - 1
+        if start:
+            size = min(size, (start & -start).bit_length() - 1)
+        cidrs.append("{}/{}".format(
+            _format_ip(family, start), width - size))
+        start += 1 << size
+
+
+def _format_ip(family, value):
+    if family == socket.AF_INET:
+        return socket.inet_ntop(family, struct.pack("!I", value))
+    return socket.inet_ntop(family, struct.pack(
+        "!QQ", value >> 64, value & 0xFFFFFFFFFFFFFFFF))
@@ -0,0 +1,45 @@
+import unittest
+
+import testtools
+
+from networking_nsxv3.plugins.ml2.drivers.nsxv3.agent import nsxv3_utils
+
+
+class AggregateIpsTest(testtools.TestCase):
+
+    def _assertAggregated(self, ips):
+        expected = nsxv3_utils.aggregate_ips(ips, backend="netaddr")
+        self.assertEqual(expected, nsxv3_utils.aggregate_ips(ips))
+
+    def test_hosts_only(self):
+        ips = ["10.0.0.{}".format(i) for i in range(256)] + \
+            ["10.0.1.1", "10.0.1.2", "10.0.1.3", "10.0.0.7", "fd00::1",
+             "fd00::2", "fd00::3", "fd00::0", "192.168.0.255"]
+        self._assertAggregated(ips)
+
+    def test_hosts_and_networks(self):
+        ips = ["10.0.0.1", "10.0.0.0/30", "10.0.0.4/30", "fd00::/64",
+               "fd00::1", "172.16.0.0/24"]
+        self._assertAggregated(ips)
+
+    def test_overlapping_networks(self):
+        ips = ["10.0.0.0/24", "10.0.0.128/25", "10.0.1.0/24", "10.0.2.0",
+               "10.0.2.1", "10.0.0.7", "fd00::/127", "fd00::2/127"]
+        self._assertAggregated(ips)
+
+    def test_empty(self):
+        self.assertEqual([], nsxv3_utils.aggregate_ips([]))
+
+    def test_coalesce_ips(self):
+        ips = ["10.0.0.3", "10.0.0.1", "10.0.0.2", "10.0.0.0", "10.0.0.5",
+               "10.0.0.2", "fd00::1", "fd00::"]
+        self.assertEqual(["10.0.0.0/30", "10.0.0.5/32", "fd00::/127"],
+                         nsxv3_utils.coalesce_ips(ips))
+
+    def test_boundaries(self):
+        self._assertAggregated(
+            ["0.0.0.0", "0.0.0.1", "255.255.255.255", "::"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+import eventlet
+import testtools
+
+from networking_nsxv3.common import synchronization as sync
+
+
+class RunnerTest(testtools.TestCase):
+
+    def setUp(self):
+        super(RunnerTest, self).setUp()
+        self.runner = sync.Runner()
+        self.calls = []
+
+    def _job(self, jid):
+        self.calls.append(jid)
+
+    def _dispatch_next(self):
+        self.runner._dispatch(*self.runner._passive.get_nowait())
+        eventlet.sleep(0)
+
+    def test_coalesce_same_or_lower_priority(self):
+        self.runner.run(sync.Priority.HIGH, ["a"], self._job)
+        self.runner.run(sync.Priority.HIGH, ["a"], self._job)
+        self.runner.run(sync.Priority.LOW, ["a"], self._job)
+        self.assertEqual(1, self.runner.passive())
+        self.assertEqual(2, self.runner.coalesced())
+
+    def test_enqueue_higher_priority(self):
+        self.runner.run(sync.Priority.LOW, ["a"], self._job)
+        self.runner.run(sync.Priority.HIGH, ["a"], self._job)
+        self.assertEqual(2, self.runner.passive())
+        self.assertEqual(0, self.runner.coalesced())
+
+    def test_dispatch_keeps_other_waiting_jobs(self):
+        self.runner.run(sync.Priority.LOW, ["a"], self._job)
+        self.runner.run(sync.Priority.HIGH, ["a"], self._job)
+
+        # The low priority job still covers new submissions
+        self._dispatch_next()
+        self.runner.run(sync.Priority.LOW, ["a"], self._job)
+        self.assertEqual(1, self.runner.passive())
+        self.assertEqual(1, self.runner.coalesced())
+
+        # Nothing covers new submissions once all jobs are dispatched
+        self._dispatch_next()
+        self.runner.run(sync.Priority.LOW, ["a"], self._job)
+        self.assertEqual(1, self.runner.passive())
+        self.assertEqual(["a", "a"], self.calls)
+
+
+class ReaderWriterLockTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ReaderWriterLockTest, self).setUp()
+        self.lock = sync.ReaderWriterLock()
+        self.order = []
+
+    def _hold(self, section, name, release):
+        with section():
+            self.order.append(name)
+            release.wait()
+
+    def _spawn(self, section, name):
+        release = eventlet.event.Event()
+        thread = eventlet.spawn(self._hold, section, name, release)
+        eventlet.sleep(0)
+        return thread, release
+
+    def test_concurrent_readers(self):
+        r1, release1 = self._spawn(self.lock.read, "r1")
+        r2, release2 = self._spawn(self.lock.read, "r2")
+        self.assertEqual(["r1", "r2"], self.order)
+        release1.send()
+        release2.send()
+        r1.wait()
+        r2.wait()
+
+    def test_waiting_writer_before_new_readers(self):
+        r1, release_r1 = self._spawn(self.lock.read, "r1")
+        w1, release_w1 = self._spawn(self.lock.write, "w1")
+        r2, release_r2 = self._spawn(self.lock.read, "r2")
+        self.assertEqual(["r1"], self.order)
+
+        release_r1.send()
+        r1.wait()
+        eventlet.sleep(0)
+        self.assertEqual(["r1", "w1"], self.order)
+
+        release_w1.send()
+        w1.wait()
+        eventlet.sleep(0)
+        self.assertEqual(["r1", "w1", "r2"], self.order)
+        release_r2.send()
+        r2.wait()
+
+
+if __name__ == '__main__':
+    unittest.main()